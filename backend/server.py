@@ -1,22 +1,34 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import socketio
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 from dotenv import load_dotenv
 from pathlib import Path
 import os
 import logging
-import uuid
+import secrets
+import hashlib
+import hmac
+import base64
+import time
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional, Dict, Any, Union
+from typing import Annotated, List, Optional, Dict, Any, Tuple, Union
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 import jwt
 import bcrypt
-from pydantic import BaseModel, Field, EmailStr, validator
-import re
+from argon2 import PasswordHasher, Type, extract_parameters
+from argon2.exceptions import InvalidHashError, VerificationError
+from pydantic import BaseModel, Field, EmailStr, StringConstraints, AfterValidator, validator
+from cachetools import TTLCache
+from redis import asyncio as redis_asyncio
+from redis.exceptions import RedisError
+import orjson
+import string
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
@@ -26,23 +38,104 @@ load_dotenv(ROOT_DIR / '.env')
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# MongoDB connection
+# Allowed CORS origins, parsed once; a frozenset makes CORSMiddleware's per-request
+# `origin in allow_origins` check a hash lookup instead of a list scan
+CORS_ORIGINS = frozenset(
+    origin.strip() for origin in os.environ.get('CORS_ORIGINS', '*').split(',') if origin.strip()
+)
+
+# MongoDB connection. The client is created in startup_event so that each worker builds
+# exactly one client, bound to the event loop that serves its requests.
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'lms_database')]
+DB_NAME = os.environ.get('DB_NAME', 'lms_database')
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '200'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '20'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '2000'))
+MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', 'zstd,zlib')
+# Idle sockets above minPoolSize are closed after this long, so a burst doesn't pin connections
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '60000'))
+client: Optional[AsyncMongoClient] = None
+db = None
+
+# Optional Redis, shared by all workers; caching stays in-process only when REDIS_URL is unset
+REDIS_URL = os.environ.get('REDIS_URL')
+redis_client: Optional[redis_asyncio.Redis] = None
 
 # JWT Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-super-secret-jwt-key')
 JWT_ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get('JWT_ACCESS_TOKEN_EXPIRE_MINUTES', '30'))
 JWT_REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get('JWT_REFRESH_TOKEN_EXPIRE_DAYS', '7'))
 JWT_ALGORITHM = "HS256"
+# Key bytes and the encoder are built once rather than per request
+_JWT_KEY = JWT_SECRET.encode('utf-8')
+_JWT_DIGEST = hashlib.sha256
+_jwt_codec = jwt.PyJWT()
+
+# Authentication caches: decoded token payloads and user documents are kept briefly
+# so repeated requests with the same token skip the JWT decode and the Mongo lookup
+AUTH_CACHE_TTL_SECONDS = int(os.environ.get('AUTH_CACHE_TTL_SECONDS', '30'))
+_token_cache = TTLCache(maxsize=10000, ttl=AUTH_CACHE_TTL_SECONDS)
+_user_cache = TTLCache(maxsize=10000, ttl=AUTH_CACHE_TTL_SECONDS)
+# Subject ownership (teacher_id) used by access checks; a reassignment is seen within the TTL
+SUBJECT_CACHE_TTL_SECONDS = int(os.environ.get('SUBJECT_CACHE_TTL_SECONDS', '30'))
+_subject_cache = TTLCache(maxsize=1024, ttl=SUBJECT_CACHE_TTL_SECONDS)
+
+# Password hashing configuration. New hashes are argon2id; bcrypt hashes from earlier
+# releases are still accepted and upgraded on the next successful login.
+ARGON2_MEMORY_COST_KIB = int(os.environ.get('ARGON2_MEMORY_COST_KIB', str(64 * 1024)))
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', '2'))
+# Server processes started by __main__; each one sizes its own hashing pool from this
+WORKERS = int(os.environ.get('WORKERS', os.cpu_count() or 1))
+# Concurrent hashes per worker. The default splits the cores between workers and argon2 lanes,
+# so a login burst across all workers stays near one hashing thread and one memory block per core
+PASSWORD_HASH_THREADS = int(
+    os.environ.get('PASSWORD_HASH_THREADS') or max(1, (os.cpu_count() or 1) // (WORKERS * ARGON2_PARALLELISM))
+)
+# Wall-clock budget for one hash when time_cost is tuned to the host at startup
+PASSWORD_HASH_TARGET_MS = int(os.environ.get('PASSWORD_HASH_TARGET_MS', '250'))
+
+def _calibrate_argon2_time_cost(target_seconds: float, floor: int = 2, ceiling: int = 10) -> int:
+    """Largest time_cost whose hash fits the budget on this host, never below the old fixed default"""
+    chosen = floor
+    for time_cost in range(floor, ceiling + 1):
+        hasher = PasswordHasher(time_cost=time_cost, memory_cost=ARGON2_MEMORY_COST_KIB, parallelism=ARGON2_PARALLELISM)
+        started = time.perf_counter()
+        hasher.hash("calibration")
+        if time.perf_counter() - started > target_seconds:
+            break
+        chosen = time_cost
+    return chosen
+
+# An explicit ARGON2_TIME_COST pins the cost; otherwise it is measured once per process
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST') or _calibrate_argon2_time_cost(PASSWORD_HASH_TARGET_MS / 1000))
+_password_hasher = PasswordHasher(
+    time_cost=ARGON2_TIME_COST,
+    memory_cost=ARGON2_MEMORY_COST_KIB,
+    parallelism=ARGON2_PARALLELISM,
+)
+_BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+# Dedicated pool for hashing, so it doesn't queue behind other default-executor work; each
+# in-flight hash holds ARGON2_MEMORY_COST_KIB, so this process never holds more than
+# PASSWORD_HASH_THREADS of them at once
+_PW_POOL = ThreadPoolExecutor(max_workers=PASSWORD_HASH_THREADS, thread_name_prefix="password-hash")
+# Verified against when the email is unknown so login timing doesn't reveal which accounts exist
+_DUMMY_HASH = _password_hasher.hash("dummy-password")
 
 # Socket.IO setup
-sio = socketio.AsyncServer(cors_allowed_origins="*", async_mode="asgi")
+# With Redis configured, emits are published through it so every worker delivers to its own sockets
+sio = socketio.AsyncServer(
+    cors_allowed_origins="*",
+    async_mode="asgi",
+    client_manager=socketio.AsyncRedisManager(REDIS_URL) if REDIS_URL else None,
+)
 socket_app = socketio.ASGIApp(sio)
 
 # FastAPI app
-app = FastAPI(title="LMS CO/PO Assessment System", description="AI-powered Learning Management System")
+app = FastAPI(
+    title="LMS CO/PO Assessment System",
+    description="AI-powered Learning Management System",
+    default_response_class=ORJSONResponse,
+)
 api_router = APIRouter(prefix="/api")
 
 # Security
@@ -54,6 +147,11 @@ class UserRole(str, Enum):
     TEACHER = "TEACHER" 
     STUDENT = "STUDENT"
 
+# Roles allowed on teacher routes, as raw strings for a plain hash lookup
+_TEACHER_ROLES = frozenset({UserRole.SUPER_ADMIN.value, UserRole.TEACHER.value})
+# Same roles as a Mongo $in operand, built once
+_TEACHER_ROLES_IN = {"$in": sorted(_TEACHER_ROLES)}
+
 class ExamStatus(str, Enum):
     DRAFT = "draft"
     SCHEDULED = "scheduled"
@@ -94,59 +192,233 @@ class Difficulty(str, Enum):
 
 # Utility functions
 def generate_uuid() -> str:
-    return str(uuid.uuid4())
+    # 128 random bits as 32 hex chars; ids are opaque, so existing dashed uuids stay valid
+    return secrets.token_hex(16)
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+_UTC = timezone.utc
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+def utc_now() -> datetime:
+    return datetime.now(_UTC)
 
-def create_access_token(data: dict) -> str:
-    to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire, "type": "access"})
-    return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
+def _verify_password_sync(password: str, hashed: str) -> bool:
+    if hashed.startswith(_BCRYPT_PREFIXES):
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    try:
+        return _password_hasher.verify(hashed, password)
+    except (VerificationError, InvalidHashError):
+        return False
 
-def create_refresh_token(data: dict) -> str:
-    to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(days=JWT_REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
-    return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
+# Password hashing is CPU-bound; run it on the hashing pool so the event loop stays responsive
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_PW_POOL, _password_hasher.hash, password)
 
-def verify_token(token: str) -> Optional[Dict]:
+async def verify_password(password: str, hashed: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_PW_POOL, _verify_password_sync, password, hashed)
+
+def password_needs_rehash(hashed: str) -> bool:
+    if hashed.startswith(_BCRYPT_PREFIXES):
+        return True
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
-    except jwt.ExpiredSignatureError:
+        params = extract_parameters(hashed)
+    except InvalidHashError:
+        return True
+    # Calibrated costs can differ slightly between workers, so only weaker hashes are upgraded
+    return (params.type is not Type.ID or params.time_cost < ARGON2_TIME_COST
+            or params.memory_cost < ARGON2_MEMORY_COST_KIB)
+
+async def authenticate_user(email: str, password: str) -> Optional[Dict]:
+    user = await db.users.find_one({"email": email}, projection=_NO_ID)
+    # Always pay for exactly one hash check, so unknown emails take as long as wrong passwords
+    password_ok = await verify_password(password, user["hashed_password"] if user else _DUMMY_HASH)
+    return user if user is not None and password_ok else None
+
+def create_access_token(user_id: str, role: str) -> str:
+    expire = utc_now() + timedelta(minutes=JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
+    return _jwt_codec.encode(
+        {"user_id": user_id, "role": role, "exp": expire, "type": "access"}, _JWT_KEY, algorithm=JWT_ALGORITHM
+    )
+
+def create_refresh_token(user_id: str) -> str:
+    expire = utc_now() + timedelta(days=JWT_REFRESH_TOKEN_EXPIRE_DAYS)
+    return _jwt_codec.encode({"user_id": user_id, "exp": expire, "type": "refresh"}, _JWT_KEY, algorithm=JWT_ALGORITHM)
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def _decode_jwt(token: str) -> Optional[Dict]:
+    """Check the HS256 signature and exp directly; our tokens carry no other registered claims"""
+    try:
+        signing_input, _, signature = token.rpartition(".")
+        header_segment, _, payload_segment = signing_input.partition(".")
+        if not header_segment or "." in payload_segment:
+            return None
+        # Compared in encoded form: decoding would skip characters outside the base64 alphabet,
+        # letting many distinct strings verify as one token
+        expected = base64.urlsafe_b64encode(
+            hmac.new(_JWT_KEY, signing_input.encode('ascii'), _JWT_DIGEST).digest()
+        ).rstrip(b"=")
+        if not hmac.compare_digest(expected, signature.encode('ascii')):
+            return None
+        header = orjson.loads(_b64url_decode(header_segment))
+        payload = orjson.loads(_b64url_decode(payload_segment))
+    except ValueError:
+        return None
+    
+    if not isinstance(header, dict) or header.get("alg") != JWT_ALGORITHM or not isinstance(payload, dict):
+        return None
+    exp = payload.get("exp")
+    if not isinstance(exp, (int, float)) or isinstance(exp, bool) or exp <= time.time():
+        return None
+    return payload
+
+def _token_cache_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+
+def verify_token(token: str) -> Optional[Dict]:
+    key = _token_cache_key(token)
+    payload = _token_cache.get(key)
+    if payload is not None:
+        # A cached payload can outlive the token itself
+        if payload["exp"] > time.time():
+            return payload
+        _token_cache.pop(key, None)
         return None
-    except jwt.JWTError:
+    
+    payload = _decode_jwt(token)
+    if payload is None:
         return None
+    
+    _token_cache[key] = payload
+    return payload
+
+def _auth_cache_key(token: str) -> str:
+    return "auth:" + hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+async def clear_auth_caches() -> None:
+    _token_cache.clear()
+    _user_cache.clear()
+    if redis_client is not None:
+        try:
+            keys = [key async for key in redis_client.scan_iter(match="auth:*", count=1000)]
+            if keys:
+                await redis_client.delete(*keys)
+        except RedisError as e:
+            # Entries left behind expire with their tokens; the users they name are already gone
+            logger.warning(f"Auth cache clear failed: {e}")
+
+# Everything is keyed on our own uuid `id`, so Mongo's ObjectId is never read back
+_NO_ID = {"_id": 0}
+
+# Fields loaded for the authenticated user; never pulls hashed_password or _id
+_USER_PROJECTION = {
+    "_id": 0, "id": 1, "email": 1, "name": 1, "role": 1, "status": 1, "phone": 1, "dept_id": 1,
+    "mfa_enabled": 1, "last_login_at": 1, "created_at": 1, "updated_at": 1,
+}
 
 # Dependencies
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict:
-    token = credentials.credentials
-    payload = verify_token(token)
+async def get_token_claims(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict:
+    payload = verify_token(credentials.credentials)
     if payload is None or payload.get("type") != "access":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    
-    user = await db.users.find_one({"id": payload.get("user_id")})
+    return payload
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    claims: Dict = Depends(get_token_claims),
+) -> Dict:
+    user_id = claims.get("user_id")
+    user = _user_cache.get(user_id)
+    if user is not None:
+        return user
+    
+    # Second tier: the Redis cache shared across workers, keyed by token
+    cache_key = _auth_cache_key(credentials.credentials)
+    if redis_client is not None:
+        try:
+            cached = await redis_client.get(cache_key)
+        except RedisError as e:
+            logger.warning(f"Auth cache read failed: {e}")
+            cached = None
+        if cached is not None:
+            user = orjson.loads(cached)
+            _user_cache[user_id] = user
+            return user
+    
+    user = await db.users.find_one({"id": user_id}, projection=_USER_PROJECTION)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    _user_cache[user_id] = user
+    
+    if redis_client is not None:
+        try:
+            # Cache for the rest of the token's lifetime
+            await redis_client.set(cache_key, orjson.dumps(user), ex=max(1, int(claims["exp"] - time.time())))
+        except RedisError as e:
+            logger.warning(f"Auth cache write failed: {e}")
     
     return user
 
-async def get_admin_user(current_user: Dict = Depends(get_current_user)) -> Dict:
-    if current_user["role"] != UserRole.SUPER_ADMIN:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
-    return current_user
+# Role checks trust the role signed into the access token instead of re-reading the user,
+# and hand handlers just the identity fields they use
+def require_roles(*roles: UserRole, detail: str = "Insufficient permissions"):
+    """Build one dependency that does token check and role check, so FastAPI resolves a single sub-dependency"""
+    allowed = frozenset(role.value for role in roles)
+    
+    async def dependency(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict:
+        claims = await get_token_claims(credentials)
+        if claims.get("role") not in allowed:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+        return {"id": claims.get("user_id"), "role": claims["role"]}
+    
+    return dependency
+
+get_admin_user = require_roles(UserRole.SUPER_ADMIN, detail="Admin access required")
+get_teacher_user = require_roles(UserRole.SUPER_ADMIN, UserRole.TEACHER, detail="Teacher access required")
+
+async def get_subject_owner(subject_id: str) -> Optional[Dict]:
+    """Subject id and teacher_id, served from the per-worker cache when fresh; misses are not cached"""
+    subject = _subject_cache.get(subject_id)
+    if subject is None:
+        subject = await db.subjects.find_one({"id": subject_id}, projection={"_id": 0, "id": 1, "teacher_id": 1})
+        if subject is not None:
+            _subject_cache[subject_id] = subject
+    return subject
+
+def check_subject_access(subject: Optional[Dict], current_user: Dict) -> Dict:
+    """Subject must exist and belong to the caller, unless they are an admin"""
+    if not subject:
+        raise HTTPException(status_code=404, detail="Subject not found")
+    
+    if (current_user["role"] != UserRole.SUPER_ADMIN and 
+        subject["teacher_id"] != current_user["id"]):
+        raise HTTPException(status_code=403, detail="Access denied")
+    return subject
 
-async def get_teacher_user(current_user: Dict = Depends(get_current_user)) -> Dict:
-    if current_user["role"] not in [UserRole.SUPER_ADMIN, UserRole.TEACHER]:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Teacher access required")
-    return current_user
+async def require_subject_access(subject_id: str, current_user: Dict = Depends(get_teacher_user)) -> Dict:
+    """Dependency form of check_subject_access for routes keyed by subject_id"""
+    return check_subject_access(await get_subject_owner(subject_id), current_user)
+
+# Password policy character classes
+_PW_LETTERS = frozenset(string.ascii_letters)
+_PW_DIGITS = frozenset(string.digits)
+
+def _normalize_email_domain(v: str) -> str:
+    # Match EmailStr normalization (lower-cased domain) so stored emails still match
+    local, _, domain = v.rpartition('@')
+    return f"{local}@{domain.lower()}"
+
+# Lightweight email type for the login hot path; EmailStr stays on write paths
+LoginEmailStr = Annotated[
+    str,
+    StringConstraints(max_length=254, pattern=r'^[^@\s]+@[^@\s]+\.[^@\s]+$'),
+    AfterValidator(_normalize_email_domain),
+]
 
 # Pydantic Models
+class TimestampedModel(BaseModel):
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
+
 class UserBase(BaseModel):
     name: str = Field(..., min_length=2, max_length=100)
     email: EmailStr
@@ -159,20 +431,19 @@ class UserCreate(UserBase):
     
     @validator('password')
     def validate_password(cls, v):
-        if not re.search(r'[A-Za-z]', v):
+        # isdisjoint walks the string in C and stops at the first hit
+        if _PW_LETTERS.isdisjoint(v):
             raise ValueError('Password must contain at least one letter')
-        if not re.search(r'[0-9]', v):
+        if _PW_DIGITS.isdisjoint(v):
             raise ValueError('Password must contain at least one number')
         return v
 
-class User(UserBase):
+class User(UserBase, TimestampedModel):
     id: str = Field(default_factory=generate_uuid)
     hashed_password: str
     status: str = "active"
     last_login_at: Optional[datetime] = None
     mfa_enabled: bool = False
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class UserResponse(UserBase):
     id: str
@@ -183,7 +454,7 @@ class UserResponse(UserBase):
     updated_at: datetime
 
 class LoginRequest(BaseModel):
-    email: EmailStr
+    email: LoginEmailStr
     password: str
 
 class LoginResponse(BaseModel):
@@ -192,67 +463,65 @@ class LoginResponse(BaseModel):
     token_type: str = "bearer"
     user: UserResponse
 
-class Department(BaseModel):
+_USER_RESPONSE_FIELDS = tuple(UserResponse.model_fields)
+
+class Department(TimestampedModel):
     id: str = Field(default_factory=generate_uuid)
     name: str = Field(..., min_length=2, max_length=100)
     code: str = Field(..., min_length=2, max_length=20)
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
-class Program(BaseModel):
+class Program(TimestampedModel):
     id: str = Field(default_factory=generate_uuid)
     dept_id: str
     name: str = Field(..., min_length=2, max_length=100)
     code: str = Field(..., min_length=2, max_length=20)
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
-class Course(BaseModel):
+class Course(TimestampedModel):
     id: str = Field(default_factory=generate_uuid)
     program_id: str
     name: str = Field(..., min_length=2, max_length=100)
     code: str = Field(..., min_length=2, max_length=20)
     semester: int = Field(..., ge=1, le=10)
     batch_year: int = Field(..., ge=2020)
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
-class Subject(BaseModel):
+class Subject(TimestampedModel):
     id: str = Field(default_factory=generate_uuid)
     course_id: str
     name: str = Field(..., min_length=2, max_length=100)
     code: str = Field(..., min_length=2, max_length=20)
     credits: float = Field(..., ge=0, le=10)
     teacher_id: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
-class CO(BaseModel):
+class CO(TimestampedModel):
     id: str = Field(default_factory=generate_uuid)
     subject_id: str
     code: str = Field(..., min_length=1, max_length=20)
     description: str = Field(..., min_length=10)
     bloom_level: BloomLevel
     target_level: float = Field(..., ge=0.0, le=1.0)
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
-class PO(BaseModel):
+class PO(TimestampedModel):
     id: str = Field(default_factory=generate_uuid)
     program_id: str
     code: str = Field(..., min_length=1, max_length=20)
     description: str = Field(..., min_length=10)
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class COPOMapping(BaseModel):
     id: str = Field(default_factory=generate_uuid)
     co_id: str
     po_id: str
     weight: int = Field(..., ge=1, le=3)  # 1=low, 2=medium, 3=high
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=utc_now)
 
-class Question(BaseModel):
+class BatchItemError(BaseModel):
+    index: int  # Position in the submitted list
+    detail: str
+
+class COPOMappingBatchResult(BaseModel):
+    inserted: List[COPOMapping]
+    errors: List[BatchItemError]
+
+class Question(TimestampedModel):
     id: str = Field(default_factory=generate_uuid)
     subject_id: str
     type: QuestionType
@@ -267,10 +536,20 @@ class Question(BaseModel):
     negative_marking: Optional[Dict] = None  # {"enabled": True, "penalty": 0.25}
     partial_scoring: Optional[Dict] = None  # For MSQ, NUMERIC
     version: int = 1
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
-class Exam(BaseModel):
+class QuestionSummary(BaseModel):
+    """Question fields needed for bank listings; options, answers and scoring rules are left out"""
+    id: str
+    type: QuestionType
+    text: str
+    max_marks: float
+    co_id: str
+    difficulty: Difficulty
+    tags: List[str]
+
+_QUESTION_SUMMARY_PROJECTION = {"_id": 0, **{field: 1 for field in QuestionSummary.model_fields}}
+
+class Exam(TimestampedModel):
     id: str = Field(default_factory=generate_uuid)
     subject_id: str
     title: str = Field(..., min_length=5)
@@ -283,8 +562,6 @@ class Exam(BaseModel):
     reentry_policy: str = Field(default="block")  # block, allow_once, allow_multiple
     created_by: str
     status: ExamStatus = ExamStatus.DRAFT
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class ExamQuestion(BaseModel):
     id: str = Field(default_factory=generate_uuid)
@@ -292,7 +569,7 @@ class ExamQuestion(BaseModel):
     question_id: str
     marks_override: Optional[float] = None
     order_index: int
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=utc_now)
 
 class ExamSession(BaseModel):
     id: str = Field(default_factory=generate_uuid)
@@ -301,9 +578,9 @@ class ExamSession(BaseModel):
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
     created_by: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=utc_now)
 
-class StudentExamAttempt(BaseModel):
+class StudentExamAttempt(TimestampedModel):
     id: str = Field(default_factory=generate_uuid)
     session_id: str
     student_id: str
@@ -313,10 +590,8 @@ class StudentExamAttempt(BaseModel):
     total_score: Optional[float] = None
     ai_scored_at: Optional[datetime] = None
     malpractice_risk: float = 0.0
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
-class Response(BaseModel):
+class Response(TimestampedModel):
     id: str = Field(default_factory=generate_uuid)
     attempt_id: str
     question_id: str
@@ -324,8 +599,6 @@ class Response(BaseModel):
     autosave_ts: Optional[datetime] = None
     final_submit_ts: Optional[datetime] = None
     client_latency_ms: Optional[int] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class Score(BaseModel):
     id: str = Field(default_factory=generate_uuid)
@@ -339,17 +612,15 @@ class Score(BaseModel):
     version: int = 1
     overridden_by: Optional[str] = None
     overridden_at: Optional[datetime] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=utc_now)
 
 # First-run setup models
-class SetupStatus(BaseModel):
+class SetupStatus(TimestampedModel):
     id: str = Field(default="setup")
     is_setup_complete: bool = False
     setup_step: int = 0  # 0=not started, 1=admin created, 2=departments, 3=programs, etc.
     admin_id: Optional[str] = None
     institute_name: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class SetupRequest(BaseModel):
     admin_email: EmailStr
@@ -357,6 +628,210 @@ class SetupRequest(BaseModel):
     admin_name: str = Field(..., min_length=2)
     institute_name: str = Field(..., min_length=2)
 
+# Query helpers
+async def _exists(collection: str, query: Dict) -> bool:
+    """Existence probe that only reads the id field, so id lookups are answered from the index"""
+    return await db[collection].find_one(query, projection={"_id": 0, "id": 1}) is not None
+
+async def _aggregate_one(collection: str, pipeline: List[Dict]) -> Optional[Dict]:
+    """Run a pipeline expected to yield at most one document"""
+    cursor = await db[collection].aggregate(pipeline)
+    docs = await cursor.to_list(1)
+    return docs[0] if docs else None
+
+async def _resolve_mapping_context(mapping_id: str) -> Optional[Dict]:
+    """Mapping with its CO and owning subject joined in, in one round trip; co/subject are empty lists when missing"""
+    return await _aggregate_one("co_po_mappings", [
+        {"$match": {"id": mapping_id}},
+        {"$limit": 1},
+        {"$lookup": {"from": "cos", "localField": "co_id", "foreignField": "id", "as": "co"}},
+        {"$lookup": {"from": "subjects", "localField": "co.subject_id", "foreignField": "id", "as": "subject"}},
+        {"$project": {"_id": 0, "co_id": 1, "co.subject_id": 1, "subject.teacher_id": 1}}
+    ])
+
+async def _load_question_with_access(
+    question_id: str, current_user: Dict, *, co_id: Optional[str] = None, with_usage: bool = False
+) -> Dict:
+    """Load a question and check the caller owns its subject, in one aggregate.
+    
+    Optionally also joins the CO (as "co", scoped to the question's subject) and exam usage (as "usage").
+    """
+    pipeline = [
+        {"$match": {"id": question_id}},
+        {"$limit": 1},
+        {"$lookup": {
+            "from": "subjects",
+            "let": {"subject_id": "$subject_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$id", "$$subject_id"]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 0, "teacher_id": 1}}
+            ],
+            "as": "subject"
+        }}
+    ]
+    if co_id is not None:
+        pipeline.append({"$lookup": {
+            "from": "cos",
+            "let": {"subject_id": "$subject_id"},
+            "pipeline": [
+                {"$match": {"id": co_id, "$expr": {"$eq": ["$subject_id", "$$subject_id"]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 0, "id": 1}}
+            ],
+            "as": "co"
+        }})
+    if with_usage:
+        # The question id is already known, so match it as a literal: a plain equality is an
+        # index seek on exam_questions.question_id on every server version, unlike $expr
+        pipeline.append({"$lookup": {
+            "from": "exam_questions",
+            "pipeline": [
+                {"$match": {"question_id": question_id}},
+                {"$limit": 1},
+                {"$project": {"_id": 1}}
+            ],
+            "as": "usage"
+        }})
+    pipeline.append({"$project": {"_id": 0}})
+    
+    question = await _aggregate_one("questions", pipeline)
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    
+    subject = question.pop("subject")
+    if not subject:
+        raise HTTPException(status_code=404, detail="Subject not found")
+    
+    if (current_user["role"] != UserRole.SUPER_ADMIN and 
+        subject[0]["teacher_id"] != current_user["id"]):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return question
+
+def _question_filter(
+    subject_id: str, type: Optional[QuestionType], difficulty: Optional[Difficulty],
+    co_id: Optional[str], tags: Optional[str]
+) -> Dict:
+    """Mongo filter for the question bank listings"""
+    query = {"subject_id": subject_id}
+    if type:
+        query["type"] = type
+    if difficulty:
+        query["difficulty"] = difficulty
+    if co_id:
+        query["co_id"] = co_id
+    if tags:
+        tag_list = [tag.strip() for tag in tags.split(",")]
+        query["tags"] = {"$in": tag_list}
+        # Restates the tag index's partial filter so the planner can use that index
+        query["tags.0"] = {"$exists": True}
+    return query
+
+def _question_index_plan(query: Dict) -> Tuple[Union[str, List], List]:
+    """Index to pin the question listing to, and a page order that index returns without a sort"""
+    # A tag filter without a CO is narrowest on the tag index; its $in scans one (subject_id, tag)
+    # range per tag, each already in id order, so the ranges are merged rather than sorted
+    if "tags" in query and "co_id" not in query:
+        return _QUESTION_TAGS_INDEX, [("id", 1)]
+    # Everything else shares the subject_id/co_id/type/difficulty prefix; the index's own key
+    # order ends in the unique id, so it is a stable page order whichever filters are present
+    return _QUESTION_FILTER_INDEX, _QUESTION_FILTER_INDEX
+
+def _plan_stages(plan: Any):
+    """Every stage name in an explain plan, however deeply nested"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+async def _check_question_plans() -> None:
+    """Explain each question listing shape and log any that would need an in-memory sort"""
+    shapes = [
+        _question_filter("", None, None, None, None),
+        _question_filter("", QuestionType.MCQ, None, None, None),
+        _question_filter("", None, Difficulty.MEDIUM, "co", None),
+        _question_filter("", None, None, None, "a,b"),
+        _question_filter("", QuestionType.MCQ, None, "co", "a"),
+    ]
+    for query in shapes:
+        hint, sort = _question_index_plan(query)
+        cursor = db.questions.find(query, projection=_NO_ID).sort(sort).hint(hint).limit(DEFAULT_PAGE_SIZE)
+        try:
+            explain = await cursor.explain()
+        except OperationFailure as e:
+            logger.warning("Could not explain question listing plan for %s: %s", sorted(query), e)
+            continue
+        if "SORT" in _plan_stages(explain.get("queryPlanner", {}).get("winningPlan")):
+            logger.error("Question listing plan for %s needs an in-memory sort on %s", sorted(query), hint)
+
+# Question type-specific checks; types without an entry have no extra requirements
+def _require_options_and_key(question: Question) -> None:
+    if not question.options or not question.correct_key:
+        raise HTTPException(status_code=400, detail="Options and correct key are required for MCQ/MSQ/True-False questions")
+
+def _require_correct_key(question: Question) -> None:
+    if question.correct_key is None:
+        raise HTTPException(status_code=400, detail="Correct answer is required for numeric questions")
+
+_QUESTION_TYPE_VALIDATORS = {
+    QuestionType.MCQ: _require_options_and_key,
+    QuestionType.MSQ: _require_options_and_key,
+    QuestionType.TRUE_FALSE: _require_options_and_key,
+    QuestionType.NUMERIC: _require_correct_key,
+}
+
+# Covering index for mapping listings: holds every COPOMapping field, so no document fetch is needed
+_MAPPING_COVERING_INDEX = [("co_id", 1), ("po_id", 1), ("weight", 1), ("id", 1), ("created_at", 1)]
+_MAPPING_PROJECTION = {"_id": 0, **{field: 1 for field, _ in _MAPPING_COVERING_INDEX}}
+
+# Upper bound on mappings accepted by one batch request
+MAX_MAPPING_BATCH = 500
+
+# Compound indexes serving the question bank filters; created at startup and hinted on listing.
+# Both end in the unique id so listings can page in index order
+_QUESTION_FILTER_INDEX = [("subject_id", 1), ("co_id", 1), ("type", 1), ("difficulty", 1), ("id", 1)]
+_QUESTION_TAGS_INDEX = "subject_id_1_tags_1_id_1_partial"
+
+# Page size bounds for list endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+async def _paginated(
+    collection: str, query: Dict, skip: int, limit: int,
+    projection: Optional[Dict] = None, hint: Optional[Union[str, List]] = None, sort: Optional[List] = None
+) -> ORJSONResponse:
+    """Fetch one page of raw documents, with the overall match count in X-Total-Count"""
+    coll = db[collection]
+    # _id order is stable across pages and is always indexed; callers pass another unique
+    # order when they need the page answered from a covering index
+    cursor = coll.find(query, projection=projection or _NO_ID).sort(sort or [("_id", 1)]).skip(skip).limit(limit)
+    if hint is not None:
+        # A pinned plan must not quietly fall back to an on-disk sort; fail instead
+        cursor = cursor.hint(hint).allow_disk_use(False)
+    # An unfiltered total comes from collection metadata instead of a scan
+    if not query:
+        total = coll.estimated_document_count()
+    elif hint is not None:
+        total = coll.count_documents(query, hint=hint)
+    else:
+        total = coll.count_documents(query)
+    docs, total = await asyncio.gather(cursor.to_list(), total)
+    return ORJSONResponse(docs, headers={"X-Total-Count": str(total)})
+
+def _login_response(user: Dict, access_token: str, refresh_token: str) -> ORJSONResponse:
+    """LoginResponse body built from an already-validated user document, without rebuilding UserResponse"""
+    return ORJSONResponse({
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "user": {field: user.get(field) for field in _USER_RESPONSE_FIELDS},
+    })
+
 # API Routes
 
 # Setup and Authentication Routes
@@ -365,18 +840,34 @@ async def reset_setup():
     """Reset setup status (for development)"""
     await db.setup.delete_many({})
     await db.users.delete_many({})
+    await clear_auth_caches()
     return {"message": "Setup reset successfully"}
 
 @api_router.get("/setup/status")
 async def get_setup_status():
     """Check if the system has been set up"""
-    setup = await db.setup.find_one({"id": "setup"})
-    if not setup:
+    # Setup document and admin existence in one round trip
+    cursor = await db.setup.aggregate([
+        {"$match": {"id": "setup"}},
+        {"$limit": 1},
+        {"$lookup": {
+            "from": "users",
+            "pipeline": [
+                {"$match": {"role": UserRole.SUPER_ADMIN.value}},
+                {"$limit": 1},
+                {"$project": {"_id": 0, "id": 1}}
+            ],
+            "as": "admin"
+        }},
+        {"$project": {"_id": 0, "is_setup_complete": 1, "setup_step": 1, "admin": 1}}
+    ])
+    results = await cursor.to_list()
+    if not results:
         return {"is_setup_complete": False, "setup_step": 0}
+    setup = results[0]
     
     # Double check if admin user actually exists
-    admin_exists = await db.users.find_one({"role": UserRole.SUPER_ADMIN})
-    if not admin_exists:
+    if not setup["admin"]:
         # Reset setup if no admin found
         await db.setup.delete_one({"id": "setup"})
         return {"is_setup_complete": False, "setup_step": 0}
@@ -386,67 +877,74 @@ async def get_setup_status():
 @api_router.post("/setup/initialize")
 async def initialize_system(setup_data: SetupRequest):
     """Initialize the system with first admin user"""
+    # Setup state and the admin email are independent reads, so issue them together
+    setup, admin_exists = await asyncio.gather(
+        db.setup.find_one({"id": "setup"}, projection={"_id": 0, "is_setup_complete": 1}),
+        _exists("users", {"email": setup_data.admin_email})
+    )
+    
     # Check if already setup
-    setup = await db.setup.find_one({"id": "setup"})
     if setup and setup.get("is_setup_complete"):
         raise HTTPException(status_code=400, detail="System already initialized")
     
     # Check if admin user already exists
-    existing_admin = await db.users.find_one({"email": setup_data.admin_email})
-    if existing_admin:
+    if admin_exists:
         raise HTTPException(status_code=400, detail="Admin user already exists")
     
+    # One timestamp for every document written by this request
+    now = utc_now()
+    
     # Create admin user
     admin_user = User(
         name=setup_data.admin_name,
         email=setup_data.admin_email,
         role=UserRole.SUPER_ADMIN,
-        hashed_password=hash_password(setup_data.admin_password)
+        hashed_password=await hash_password(setup_data.admin_password),
+        created_at=now,
+        updated_at=now
     )
     
-    await db.users.insert_one(admin_user.dict())
+    admin_doc = admin_user.model_dump()
+    await db.users.insert_one(admin_doc)
     
     # Update setup status
     setup_status = SetupStatus(
         is_setup_complete=True,
         setup_step=1,
         admin_id=admin_user.id,
-        institute_name=setup_data.institute_name
+        institute_name=setup_data.institute_name,
+        created_at=now,
+        updated_at=now
     )
     
-    await db.setup.replace_one({"id": "setup"}, setup_status.dict(), upsert=True)
+    await db.setup.replace_one({"id": "setup"}, setup_status.model_dump(), upsert=True)
     
     # Create access tokens
-    access_token = create_access_token({"user_id": admin_user.id, "role": admin_user.role})
-    refresh_token = create_refresh_token({"user_id": admin_user.id})
+    access_token = create_access_token(admin_user.id, admin_user.role)
+    refresh_token = create_refresh_token(admin_user.id)
     
-    return LoginResponse(
-        access_token=access_token,
-        refresh_token=refresh_token,
-        user=UserResponse(**admin_user.dict())
-    )
+    return _login_response(admin_doc, access_token, refresh_token)
 
 @api_router.post("/auth/login", response_model=LoginResponse)
 async def login(login_data: LoginRequest):
     """Authenticate user and return tokens"""
-    user = await db.users.find_one({"email": login_data.email})
-    if not user or not verify_password(login_data.password, user["hashed_password"]):
+    user = await authenticate_user(login_data.email, login_data.password)
+    if user is None:
         raise HTTPException(status_code=400, detail="Invalid credentials")
     
-    # Update last login
+    # Update last login, upgrading legacy or outdated password hashes while we have the plaintext
+    updates = {"last_login_at": utc_now()}
+    if password_needs_rehash(user["hashed_password"]):
+        updates["hashed_password"] = await hash_password(login_data.password)
     await db.users.update_one(
         {"id": user["id"]},
-        {"$set": {"last_login_at": datetime.now(timezone.utc)}}
+        {"$set": updates}
     )
     
-    access_token = create_access_token({"user_id": user["id"], "role": user["role"]})
-    refresh_token = create_refresh_token({"user_id": user["id"]})
+    access_token = create_access_token(user["id"], user["role"])
+    refresh_token = create_refresh_token(user["id"])
     
-    return LoginResponse(
-        access_token=access_token,
-        refresh_token=refresh_token,
-        user=UserResponse(**user)
-    )
+    return _login_response(user, access_token, refresh_token)
 
 @api_router.post("/auth/refresh")
 async def refresh_token(refresh_token: str):
@@ -455,12 +953,12 @@ async def refresh_token(refresh_token: str):
     if payload is None or payload.get("type") != "refresh":
         raise HTTPException(status_code=401, detail="Invalid refresh token")
     
-    user = await db.users.find_one({"id": payload.get("user_id")})
+    user = await db.users.find_one({"id": payload.get("user_id")}, projection=_NO_ID)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     
-    access_token = create_access_token({"user_id": user["id"], "role": user["role"]})
-    new_refresh_token = create_refresh_token({"user_id": user["id"]})
+    access_token = create_access_token(user["id"], user["role"])
+    new_refresh_token = create_refresh_token(user["id"])
     
     return {"access_token": access_token, "refresh_token": new_refresh_token, "token_type": "bearer"}
 
@@ -468,107 +966,99 @@ async def refresh_token(refresh_token: str):
 @api_router.get("/users/me", response_model=UserResponse)
 async def get_current_user_info(current_user: Dict = Depends(get_current_user)):
     """Get current user information"""
-    return UserResponse(**current_user)
+    # Already projected to the UserResponse fields
+    return ORJSONResponse(current_user)
 
 @api_router.get("/users", response_model=List[UserResponse])
-async def list_users(current_user: Dict = Depends(get_admin_user)):
+async def list_users(skip: int = Query(0, ge=0), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), current_user: Dict = Depends(get_admin_user)):
     """List all users (admin only)"""
-    users = await db.users.find().to_list(1000)
-    return [UserResponse(**user) for user in users]
+    # Documents were validated on write and the projection already matches
+    # UserResponse, so encode them directly instead of round-tripping through models
+    return await _paginated("users", {}, skip, limit, projection=_USER_PROJECTION)
 
 @api_router.post("/users", response_model=UserResponse)
 async def create_user(user_data: UserCreate, current_user: Dict = Depends(get_admin_user)):
     """Create a new user (admin only)"""
-    # Check if user already exists
-    existing_user = await db.users.find_one({"email": user_data.email})
-    if existing_user:
+    # user_data was validated as the request body; model_construct fills defaults without re-running the validators
+    new_user = User.model_construct(
+        **user_data.model_dump(exclude={"password"}), hashed_password=await hash_password(user_data.password)
+    )
+    user_doc = new_user.model_dump()
+    # The unique email index rejects duplicates in the same round trip as the insert
+    try:
+        await db.users.insert_one(user_doc)
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="User with this email already exists")
     
-    new_user = User(**user_data.dict(), hashed_password=hash_password(user_data.password))
-    await db.users.insert_one(new_user.dict())
-    
-    return UserResponse(**new_user.dict())
+    # insert_one added _id to user_doc; pick out just the public fields
+    return ORJSONResponse({field: user_doc.get(field) for field in _USER_RESPONSE_FIELDS})
 
 # Department Management Routes
 @api_router.get("/departments", response_model=List[Department])
-async def list_departments(current_user: Dict = Depends(get_current_user)):
+async def list_departments(skip: int = Query(0, ge=0), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), current_user: Dict = Depends(get_current_user)):
     """List all departments"""
-    departments = await db.departments.find().to_list(1000)
-    return [Department(**dept) for dept in departments]
+    return await _paginated("departments", {}, skip, limit)
 
 @api_router.post("/departments", response_model=Department)
 async def create_department(dept_data: Department, current_user: Dict = Depends(get_admin_user)):
     """Create a new department (admin only)"""
-    # Check for duplicate code
-    existing_dept = await db.departments.find_one({"code": dept_data.code})
-    if existing_dept:
+    try:
+        await db.departments.insert_one(dept_data.model_dump())
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Department code already exists")
-    
-    await db.departments.insert_one(dept_data.dict())
     return dept_data
 
 # Program Management Routes
 @api_router.get("/programs", response_model=List[Program])
-async def list_programs(dept_id: Optional[str] = None, current_user: Dict = Depends(get_current_user)):
+async def list_programs(dept_id: Optional[str] = None, skip: int = Query(0, ge=0), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), current_user: Dict = Depends(get_current_user)):
     """List programs, optionally filtered by department"""
     query = {"dept_id": dept_id} if dept_id else {}
-    programs = await db.programs.find(query).to_list(1000)
-    return [Program(**prog) for prog in programs]
+    return await _paginated("programs", query, skip, limit)
 
 @api_router.post("/programs", response_model=Program)
 async def create_program(prog_data: Program, current_user: Dict = Depends(get_admin_user)):
     """Create a new program (admin only)"""
-    # Check for duplicate code
-    existing_prog = await db.programs.find_one({"code": prog_data.code})
-    if existing_prog:
-        raise HTTPException(status_code=400, detail="Program code already exists")
-    
     # Verify department exists
-    dept = await db.departments.find_one({"id": prog_data.dept_id})
-    if not dept:
+    if not await _exists("departments", {"id": prog_data.dept_id}):
         raise HTTPException(status_code=400, detail="Department not found")
     
-    await db.programs.insert_one(prog_data.dict())
+    try:
+        await db.programs.insert_one(prog_data.model_dump())
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Program code already exists")
     return prog_data
 
 # Course Management Routes
 @api_router.get("/courses", response_model=List[Course])
-async def list_courses(program_id: Optional[str] = None, current_user: Dict = Depends(get_current_user)):
+async def list_courses(program_id: Optional[str] = None, skip: int = Query(0, ge=0), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), current_user: Dict = Depends(get_current_user)):
     """List courses, optionally filtered by program"""
     query = {"program_id": program_id} if program_id else {}
-    courses = await db.courses.find(query).to_list(1000)
-    return [Course(**course) for course in courses]
+    return await _paginated("courses", query, skip, limit)
 
 @api_router.post("/courses", response_model=Course)
 async def create_course(course_data: Course, current_user: Dict = Depends(get_admin_user)):
     """Create a new course (admin only)"""
-    # Check for duplicate code within the same program
-    existing_course = await db.courses.find_one({
-        "program_id": course_data.program_id,
-        "code": course_data.code
-    })
-    if existing_course:
-        raise HTTPException(status_code=400, detail="Course code already exists in this program")
-    
     # Verify program exists
-    program = await db.programs.find_one({"id": course_data.program_id})
-    if not program:
+    if not await _exists("programs", {"id": course_data.program_id}):
         raise HTTPException(status_code=400, detail="Program not found")
     
-    await db.courses.insert_one(course_data.dict())
+    try:
+        await db.courses.insert_one(course_data.model_dump())
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Course code already exists in this program")
     return course_data
 
 @api_router.get("/courses/{course_id}", response_model=Course)
 async def get_course(course_id: str, current_user: Dict = Depends(get_current_user)):
     """Get course by ID"""
-    course = await db.courses.find_one({"id": course_id})
+    course = await db.courses.find_one({"id": course_id}, projection=_NO_ID)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
-    return Course(**course)
+    return ORJSONResponse(course)
 
 # Subject Management Routes
 @api_router.get("/subjects", response_model=List[Subject])
-async def list_subjects(course_id: Optional[str] = None, teacher_id: Optional[str] = None, current_user: Dict = Depends(get_current_user)):
+async def list_subjects(course_id: Optional[str] = None, teacher_id: Optional[str] = None, skip: int = Query(0, ge=0), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), current_user: Dict = Depends(get_current_user)):
     """List subjects, optionally filtered by course or teacher"""
     query = {}
     if course_id:
@@ -576,67 +1066,60 @@ async def list_subjects(course_id: Optional[str] = None, teacher_id: Optional[st
     if teacher_id:
         query["teacher_id"] = teacher_id
     
-    subjects = await db.subjects.find(query).to_list(1000)
-    return [Subject(**subject) for subject in subjects]
+    return await _paginated("subjects", query, skip, limit)
 
 @api_router.post("/subjects", response_model=Subject)
 async def create_subject(subject_data: Subject, current_user: Dict = Depends(get_admin_user)):
     """Create a new subject (admin only)"""
-    # Check for duplicate code within the same course
-    existing_subject = await db.subjects.find_one({
-        "course_id": subject_data.course_id,
-        "code": subject_data.code
-    })
-    if existing_subject:
-        raise HTTPException(status_code=400, detail="Subject code already exists in this course")
-    
-    # Verify course exists
-    course = await db.courses.find_one({"id": subject_data.course_id})
-    if not course:
+    # Verify course exists and teacher exists with a teaching role; the two reads are independent
+    course_exists, teacher_exists = await asyncio.gather(
+        _exists("courses", {"id": subject_data.course_id}),
+        _exists("users", {
+            "id": subject_data.teacher_id,
+            "role": _TEACHER_ROLES_IN
+        }),
+    )
+    if not course_exists:
         raise HTTPException(status_code=400, detail="Course not found")
-    
-    # Verify teacher exists and has TEACHER role
-    teacher = await db.users.find_one({
-        "id": subject_data.teacher_id,
-        "role": {"$in": [UserRole.TEACHER, UserRole.SUPER_ADMIN]}
-    })
-    if not teacher:
+    if not teacher_exists:
         raise HTTPException(status_code=400, detail="Teacher not found or invalid role")
     
-    await db.subjects.insert_one(subject_data.dict())
+    try:
+        await db.subjects.insert_one(subject_data.model_dump())
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Subject code already exists in this course")
     return subject_data
 
 @api_router.get("/subjects/{subject_id}", response_model=Subject)
 async def get_subject(subject_id: str, current_user: Dict = Depends(get_current_user)):
     """Get subject by ID"""
-    subject = await db.subjects.find_one({"id": subject_id})
+    subject = await db.subjects.find_one({"id": subject_id}, projection=_NO_ID)
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
-    return Subject(**subject)
+    return ORJSONResponse(subject)
 
 # CO Management Routes
 @api_router.get("/subjects/{subject_id}/cos", response_model=List[CO])
-async def list_subject_cos(subject_id: str, current_user: Dict = Depends(get_current_user)):
+async def list_subject_cos(subject_id: str, skip: int = Query(0, ge=0), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), current_user: Dict = Depends(get_current_user)):
     """List all COs for a subject"""
     # Verify subject exists and user has access
-    subject = await db.subjects.find_one({"id": subject_id})
+    subject = await get_subject_owner(subject_id)
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
     
     # Check if user is admin, teacher of this subject, or student enrolled
-    if (current_user["role"] not in [UserRole.SUPER_ADMIN, UserRole.TEACHER] and 
+    if (current_user["role"] not in _TEACHER_ROLES and 
         subject["teacher_id"] != current_user["id"]):
         # For students, we might want to check enrollment later
         pass
     
-    cos = await db.cos.find({"subject_id": subject_id}).to_list(1000)
-    return [CO(**co) for co in cos]
+    return await _paginated("cos", {"subject_id": subject_id}, skip, limit)
 
 @api_router.post("/subjects/{subject_id}/cos", response_model=CO)
 async def create_co(subject_id: str, co_data: CO, current_user: Dict = Depends(get_teacher_user)):
     """Create a new CO for a subject (teacher/admin only)"""
     # Verify subject exists
-    subject = await db.subjects.find_one({"id": subject_id})
+    subject = await get_subject_owner(subject_id)
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
     
@@ -645,29 +1128,24 @@ async def create_co(subject_id: str, co_data: CO, current_user: Dict = Depends(g
         subject["teacher_id"] != current_user["id"]):
         raise HTTPException(status_code=403, detail="Access denied. You can only manage COs for your own subjects")
     
-    # Check for duplicate CO code within the same subject
-    existing_co = await db.cos.find_one({
-        "subject_id": subject_id,
-        "code": co_data.code
-    })
-    if existing_co:
-        raise HTTPException(status_code=400, detail="CO code already exists in this subject")
-    
     # Set the subject_id
     co_data.subject_id = subject_id
-    await db.cos.insert_one(co_data.dict())
+    try:
+        await db.cos.insert_one(co_data.model_dump())
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="CO code already exists in this subject")
     return co_data
 
 @api_router.put("/cos/{co_id}", response_model=CO)
 async def update_co(co_id: str, co_data: CO, current_user: Dict = Depends(get_teacher_user)):
     """Update a CO (teacher/admin only)"""
     # Verify CO exists
-    existing_co = await db.cos.find_one({"id": co_id})
+    existing_co = await db.cos.find_one({"id": co_id}, projection=_NO_ID)
     if not existing_co:
         raise HTTPException(status_code=404, detail="CO not found")
     
     # Verify subject exists and user has access
-    subject = await db.subjects.find_one({"id": existing_co["subject_id"]})
+    subject = await get_subject_owner(existing_co["subject_id"])
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
     
@@ -675,34 +1153,27 @@ async def update_co(co_id: str, co_data: CO, current_user: Dict = Depends(get_te
         subject["teacher_id"] != current_user["id"]):
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Check for duplicate CO code if code is being changed
-    if co_data.code != existing_co["code"]:
-        duplicate_co = await db.cos.find_one({
-            "subject_id": existing_co["subject_id"],
-            "code": co_data.code,
-            "id": {"$ne": co_id}
-        })
-        if duplicate_co:
-            raise HTTPException(status_code=400, detail="CO code already exists in this subject")
-    
-    # Update CO
+    # Update CO; a changed code that collides with another CO trips the unique index
     co_data.subject_id = existing_co["subject_id"]
     co_data.id = co_id
-    co_data.updated_at = datetime.now(timezone.utc)
+    co_data.updated_at = utc_now()
     
-    await db.cos.replace_one({"id": co_id}, co_data.dict())
+    try:
+        await db.cos.replace_one({"id": co_id}, co_data.model_dump())
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="CO code already exists in this subject")
     return co_data
 
 @api_router.delete("/cos/{co_id}")
 async def delete_co(co_id: str, current_user: Dict = Depends(get_teacher_user)):
     """Delete a CO (teacher/admin only)"""
     # Verify CO exists
-    existing_co = await db.cos.find_one({"id": co_id})
+    existing_co = await db.cos.find_one({"id": co_id}, projection=_NO_ID)
     if not existing_co:
         raise HTTPException(status_code=404, detail="CO not found")
     
     # Verify subject exists and user has access
-    subject = await db.subjects.find_one({"id": existing_co["subject_id"]})
+    subject = await get_subject_owner(existing_co["subject_id"])
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
     
@@ -711,10 +1182,13 @@ async def delete_co(co_id: str, current_user: Dict = Depends(get_teacher_user)):
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Check if CO is being used in questions or mappings
-    questions_count = await db.questions.count_documents({"co_id": co_id})
-    mappings_count = await db.co_po_mappings.count_documents({"co_id": co_id})
+    # Both are single-document index probes, issued together
+    in_questions, in_mappings = await asyncio.gather(
+        _exists("questions", {"co_id": co_id}),
+        _exists("co_po_mappings", {"co_id": co_id})
+    )
     
-    if questions_count > 0 or mappings_count > 0:
+    if in_questions or in_mappings:
         raise HTTPException(status_code=400, detail="Cannot delete CO. It is being used in questions or PO mappings")
     
     await db.cos.delete_one({"id": co_id})
@@ -722,133 +1196,198 @@ async def delete_co(co_id: str, current_user: Dict = Depends(get_teacher_user)):
 
 # PO Management Routes
 @api_router.get("/programs/{program_id}/pos", response_model=List[PO])
-async def list_program_pos(program_id: str, current_user: Dict = Depends(get_current_user)):
+async def list_program_pos(program_id: str, skip: int = Query(0, ge=0), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), current_user: Dict = Depends(get_current_user)):
     """List all POs for a program"""
     # Verify program exists
-    program = await db.programs.find_one({"id": program_id})
-    if not program:
+    if not await _exists("programs", {"id": program_id}):
         raise HTTPException(status_code=404, detail="Program not found")
     
-    pos = await db.pos.find({"program_id": program_id}).to_list(1000)
-    return [PO(**po) for po in pos]
+    return await _paginated("pos", {"program_id": program_id}, skip, limit)
 
 @api_router.post("/programs/{program_id}/pos", response_model=PO)
 async def create_po(program_id: str, po_data: PO, current_user: Dict = Depends(get_admin_user)):
     """Create a new PO for a program (admin only)"""
     # Verify program exists
-    program = await db.programs.find_one({"id": program_id})
-    if not program:
+    if not await _exists("programs", {"id": program_id}):
         raise HTTPException(status_code=404, detail="Program not found")
     
-    # Check for duplicate PO code within the same program
-    existing_po = await db.pos.find_one({
-        "program_id": program_id,
-        "code": po_data.code
-    })
-    if existing_po:
-        raise HTTPException(status_code=400, detail="PO code already exists in this program")
-    
     # Set the program_id
     po_data.program_id = program_id
-    await db.pos.insert_one(po_data.dict())
+    try:
+        await db.pos.insert_one(po_data.model_dump())
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="PO code already exists in this program")
     return po_data
 
 # CO-PO Mapping Routes
 @api_router.get("/cos/{co_id}/po-mappings", response_model=List[COPOMapping])
-async def list_co_po_mappings(co_id: str, current_user: Dict = Depends(get_current_user)):
+async def list_co_po_mappings(co_id: str, skip: int = Query(0, ge=0), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), current_user: Dict = Depends(get_current_user)):
     """List all PO mappings for a CO"""
     # Verify CO exists
-    co = await db.cos.find_one({"id": co_id})
-    if not co:
+    if not await _exists("cos", {"id": co_id}):
         raise HTTPException(status_code=404, detail="CO not found")
     
-    mappings = await db.co_po_mappings.find({"co_id": co_id}).to_list(1000)
-    return [COPOMapping(**mapping) for mapping in mappings]
+    # Answered from the covering index alone: every projected field is in it, and po_id is unique per CO
+    return await _paginated(
+        "co_po_mappings", {"co_id": co_id}, skip, limit,
+        projection=_MAPPING_PROJECTION, sort=[("po_id", 1)]
+    )
 
 @api_router.post("/cos/{co_id}/po-mappings", response_model=COPOMapping)
 async def create_co_po_mapping(co_id: str, mapping_data: COPOMapping, current_user: Dict = Depends(get_teacher_user)):
     """Create CO-PO mapping (teacher/admin only)"""
-    # Verify CO exists and user has access
-    co = await db.cos.find_one({"id": co_id})
-    if not co:
+    # CO, its subject and the target PO in one round trip, matching on the CO first
+    context = await _aggregate_one("cos", [
+        {"$match": {"id": co_id}},
+        {"$limit": 1},
+        {"$lookup": {"from": "subjects", "localField": "subject_id", "foreignField": "id", "as": "subject"}},
+        {"$lookup": {
+            "from": "pos",
+            "pipeline": [{"$match": {"id": mapping_data.po_id}}, {"$limit": 1}, {"$project": {"_id": 0, "id": 1}}],
+            "as": "po"
+        }},
+        {"$project": {"_id": 0, "subject.teacher_id": 1, "po": 1}}
+    ])
+    if not context:
         raise HTTPException(status_code=404, detail="CO not found")
     
     # Verify subject and user access
-    subject = await db.subjects.find_one({"id": co["subject_id"]})
-    if not subject:
+    if not context["subject"]:
         raise HTTPException(status_code=404, detail="Subject not found")
     
     if (current_user["role"] != UserRole.SUPER_ADMIN and 
-        subject["teacher_id"] != current_user["id"]):
+        context["subject"][0]["teacher_id"] != current_user["id"]):
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Verify PO exists
-    po = await db.pos.find_one({"id": mapping_data.po_id})
-    if not po:
+    if not context["po"]:
         raise HTTPException(status_code=404, detail="PO not found")
     
-    # Check for duplicate mapping
-    existing_mapping = await db.co_po_mappings.find_one({
-        "co_id": co_id,
-        "po_id": mapping_data.po_id
-    })
-    if existing_mapping:
-        raise HTTPException(status_code=400, detail="CO-PO mapping already exists")
-    
-    # Set the co_id
+    # Set the co_id; the unique (co_id, po_id) index rejects a duplicate atomically with the insert
     mapping_data.co_id = co_id
-    await db.co_po_mappings.insert_one(mapping_data.dict())
+    try:
+        await db.co_po_mappings.insert_one(mapping_data.model_dump())
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="CO-PO mapping already exists")
     return mapping_data
 
+@api_router.post("/subjects/{subject_id}/co-po-mappings/batch", response_model=COPOMappingBatchResult)
+async def create_co_po_mappings_batch(subject_id: str, mappings: List[COPOMapping], current_user: Dict = Depends(get_teacher_user)):
+    """Create many CO-PO mappings for a subject in one write (teacher/admin only)"""
+    if not mappings:
+        raise HTTPException(status_code=400, detail="No mappings provided")
+    if len(mappings) > MAX_MAPPING_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_MAPPING_BATCH} mappings per batch")
+    
+    # Subject access, which requested COs belong to it and which requested POs exist, in one round trip
+    context = await _aggregate_one("subjects", [
+        {"$match": {"id": subject_id}},
+        {"$limit": 1},
+        {"$lookup": {
+            "from": "cos",
+            "pipeline": [
+                {"$match": {"subject_id": subject_id, "id": {"$in": list({m.co_id for m in mappings})}}},
+                {"$project": {"_id": 0, "id": 1}}
+            ],
+            "as": "cos"
+        }},
+        {"$lookup": {
+            "from": "pos",
+            "pipeline": [
+                {"$match": {"id": {"$in": list({m.po_id for m in mappings})}}},
+                {"$project": {"_id": 0, "id": 1}}
+            ],
+            "as": "pos"
+        }},
+        {"$project": {"_id": 0, "teacher_id": 1, "cos": 1, "pos": 1}}
+    ])
+    if not context:
+        raise HTTPException(status_code=404, detail="Subject not found")
+    
+    if (current_user["role"] != UserRole.SUPER_ADMIN and 
+        context["teacher_id"] != current_user["id"]):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    known_cos = {co["id"] for co in context["cos"]}
+    known_pos = {po["id"] for po in context["pos"]}
+    errors = []
+    # (position in request, document) for every mapping that passed validation
+    pending = []
+    for index, mapping in enumerate(mappings):
+        if mapping.co_id not in known_cos:
+            errors.append({"index": index, "detail": "CO not found in this subject"})
+        elif mapping.po_id not in known_pos:
+            errors.append({"index": index, "detail": "PO not found"})
+        else:
+            pending.append((index, mapping.model_dump()))
+    
+    # Unordered so one rejected row doesn't stop the rest; the unique (co_id, po_id) index rejects duplicates
+    failed = set()
+    if pending:
+        try:
+            await db.co_po_mappings.insert_many([doc for _, doc in pending], ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                failed.add(write_error["index"])
+                detail = ("CO-PO mapping already exists" if write_error.get("code") == 11000
+                          else write_error.get("errmsg", "Write failed"))
+                errors.append({"index": pending[write_error["index"]][0], "detail": detail})
+    
+    inserted = []
+    for position, (_, doc) in enumerate(pending):
+        if position not in failed:
+            doc.pop("_id", None)
+            inserted.append(doc)
+    errors.sort(key=lambda error: error["index"])
+    return ORJSONResponse({"inserted": inserted, "errors": errors})
+
 @api_router.put("/co-po-mappings/{mapping_id}", response_model=COPOMapping)
 async def update_co_po_mapping(mapping_id: str, mapping_data: COPOMapping, current_user: Dict = Depends(get_teacher_user)):
     """Update CO-PO mapping weight (teacher/admin only)"""
-    # Verify mapping exists
-    existing_mapping = await db.co_po_mappings.find_one({"id": mapping_id})
-    if not existing_mapping:
+    # Verify mapping exists, with its CO and subject joined in
+    context = await _resolve_mapping_context(mapping_id)
+    if not context:
         raise HTTPException(status_code=404, detail="CO-PO mapping not found")
     
     # Verify CO and subject access
-    co = await db.cos.find_one({"id": existing_mapping["co_id"]})
-    if not co:
+    if not context["co"]:
         raise HTTPException(status_code=404, detail="CO not found")
     
-    subject = await db.subjects.find_one({"id": co["subject_id"]})
-    if not subject:
+    if not context["subject"]:
         raise HTTPException(status_code=404, detail="Subject not found")
     
     if (current_user["role"] != UserRole.SUPER_ADMIN and 
-        subject["teacher_id"] != current_user["id"]):
+        context["subject"][0]["teacher_id"] != current_user["id"]):
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Update only the weight
-    await db.co_po_mappings.update_one(
+    # Update only the weight, reading back the result in the same command
+    updated_mapping = await db.co_po_mappings.find_one_and_update(
         {"id": mapping_id},
-        {"$set": {"weight": mapping_data.weight}}
+        {"$set": {"weight": mapping_data.weight}},
+        projection=_NO_ID,
+        return_document=ReturnDocument.AFTER
     )
-    
-    updated_mapping = await db.co_po_mappings.find_one({"id": mapping_id})
-    return COPOMapping(**updated_mapping)
+    if not updated_mapping:
+        raise HTTPException(status_code=404, detail="CO-PO mapping not found")
+    return ORJSONResponse(updated_mapping)
 
 @api_router.delete("/co-po-mappings/{mapping_id}")
 async def delete_co_po_mapping(mapping_id: str, current_user: Dict = Depends(get_teacher_user)):
     """Delete CO-PO mapping (teacher/admin only)"""
-    # Verify mapping exists
-    existing_mapping = await db.co_po_mappings.find_one({"id": mapping_id})
-    if not existing_mapping:
+    # Verify mapping exists, with its CO and subject joined in
+    context = await _resolve_mapping_context(mapping_id)
+    if not context:
         raise HTTPException(status_code=404, detail="CO-PO mapping not found")
     
     # Verify CO and subject access
-    co = await db.cos.find_one({"id": existing_mapping["co_id"]})
-    if not co:
+    if not context["co"]:
         raise HTTPException(status_code=404, detail="CO not found")
     
-    subject = await db.subjects.find_one({"id": co["subject_id"]})
-    if not subject:
+    if not context["subject"]:
         raise HTTPException(status_code=404, detail="Subject not found")
     
     if (current_user["role"] != UserRole.SUPER_ADMIN and 
-        subject["teacher_id"] != current_user["id"]):
+        context["subject"][0]["teacher_id"] != current_user["id"]):
         raise HTTPException(status_code=403, detail="Access denied")
     
     await db.co_po_mappings.delete_one({"id": mapping_id})
@@ -862,133 +1401,90 @@ async def list_subject_questions(
     difficulty: Optional[Difficulty] = None,
     co_id: Optional[str] = None,
     tags: Optional[str] = None,
-    current_user: Dict = Depends(get_teacher_user)
+    skip: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    subject: Dict = Depends(require_subject_access)
 ):
     """List questions for a subject with optional filters"""
-    # Verify subject exists and user has access
-    subject = await db.subjects.find_one({"id": subject_id})
-    if not subject:
-        raise HTTPException(status_code=404, detail="Subject not found")
-    
-    if (current_user["role"] != UserRole.SUPER_ADMIN and 
-        subject["teacher_id"] != current_user["id"]):
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    # Build query
-    query = {"subject_id": subject_id}
-    if type:
-        query["type"] = type
-    if difficulty:
-        query["difficulty"] = difficulty
-    if co_id:
-        query["co_id"] = co_id
-    if tags:
-        tag_list = [tag.strip() for tag in tags.split(",")]
-        query["tags"] = {"$in": tag_list}
-    
-    questions = await db.questions.find(query).to_list(1000)
-    return [Question(**question) for question in questions]
+    query = _question_filter(subject_id, type, difficulty, co_id, tags)
+    hint, sort = _question_index_plan(query)
+    return await _paginated("questions", query, skip, limit, hint=hint, sort=sort)
+
+@api_router.get("/subjects/{subject_id}/questions/summary", response_model=List[QuestionSummary])
+async def list_subject_question_summaries(
+    subject_id: str, 
+    type: Optional[QuestionType] = None,
+    difficulty: Optional[Difficulty] = None,
+    co_id: Optional[str] = None,
+    tags: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    subject: Dict = Depends(require_subject_access)
+):
+    """List question summaries for a subject, with the same filters as the full listing"""
+    query = _question_filter(subject_id, type, difficulty, co_id, tags)
+    hint, sort = _question_index_plan(query)
+    return await _paginated(
+        "questions", query, skip, limit, projection=_QUESTION_SUMMARY_PROJECTION, hint=hint, sort=sort
+    )
 
 @api_router.post("/subjects/{subject_id}/questions", response_model=Question)
 async def create_question(subject_id: str, question_data: Question, current_user: Dict = Depends(get_teacher_user)):
     """Create a new question (teacher/admin only)"""
-    # Verify subject exists and user has access
-    subject = await db.subjects.find_one({"id": subject_id})
-    if not subject:
-        raise HTTPException(status_code=404, detail="Subject not found")
-    
-    if (current_user["role"] != UserRole.SUPER_ADMIN and 
-        subject["teacher_id"] != current_user["id"]):
-        raise HTTPException(status_code=403, detail="Access denied")
+    # Subject access and CO membership don't depend on each other, so both reads overlap
+    subject, co_exists = await asyncio.gather(
+        get_subject_owner(subject_id),
+        _exists("cos", {"id": question_data.co_id, "subject_id": subject_id})
+    )
+    check_subject_access(subject, current_user)
     
     # Verify CO exists and belongs to this subject
-    co = await db.cos.find_one({"id": question_data.co_id, "subject_id": subject_id})
-    if not co:
+    if not co_exists:
         raise HTTPException(status_code=400, detail="CO not found in this subject")
     
     # Validate question type-specific requirements
-    if question_data.type in [QuestionType.MCQ, QuestionType.MSQ, QuestionType.TRUE_FALSE]:
-        if not question_data.options or not question_data.correct_key:
-            raise HTTPException(status_code=400, detail="Options and correct key are required for MCQ/MSQ/True-False questions")
-    
-    if question_data.type == QuestionType.NUMERIC:
-        if question_data.correct_key is None:
-            raise HTTPException(status_code=400, detail="Correct answer is required for numeric questions")
+    type_validator = _QUESTION_TYPE_VALIDATORS.get(question_data.type)
+    if type_validator is not None:
+        type_validator(question_data)
     
     # Set the subject_id
     question_data.subject_id = subject_id
-    await db.questions.insert_one(question_data.dict())
+    await db.questions.insert_one(question_data.model_dump())
     return question_data
 
 @api_router.get("/questions/{question_id}", response_model=Question)
 async def get_question(question_id: str, current_user: Dict = Depends(get_teacher_user)):
     """Get question by ID"""
-    question = await db.questions.find_one({"id": question_id})
-    if not question:
-        raise HTTPException(status_code=404, detail="Question not found")
-    
-    # Verify user has access to this question's subject
-    subject = await db.subjects.find_one({"id": question["subject_id"]})
-    if not subject:
-        raise HTTPException(status_code=404, detail="Subject not found")
-    
-    if (current_user["role"] != UserRole.SUPER_ADMIN and 
-        subject["teacher_id"] != current_user["id"]):
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    return Question(**question)
+    question = await _load_question_with_access(question_id, current_user)
+    return ORJSONResponse(question)
 
 @api_router.put("/questions/{question_id}", response_model=Question)
 async def update_question(question_id: str, question_data: Question, current_user: Dict = Depends(get_teacher_user)):
     """Update a question (teacher/admin only)"""
-    # Verify question exists
-    existing_question = await db.questions.find_one({"id": question_id})
-    if not existing_question:
-        raise HTTPException(status_code=404, detail="Question not found")
-    
-    # Verify subject and user access
-    subject = await db.subjects.find_one({"id": existing_question["subject_id"]})
-    if not subject:
-        raise HTTPException(status_code=404, detail="Subject not found")
-    
-    if (current_user["role"] != UserRole.SUPER_ADMIN and 
-        subject["teacher_id"] != current_user["id"]):
-        raise HTTPException(status_code=403, detail="Access denied")
+    # Verify question exists and user access, with the CO membership check in the same round trip
+    existing_question = await _load_question_with_access(question_id, current_user, co_id=question_data.co_id)
     
     # Verify CO exists and belongs to this subject
-    co = await db.cos.find_one({"id": question_data.co_id, "subject_id": existing_question["subject_id"]})
-    if not co:
+    if not existing_question["co"]:
         raise HTTPException(status_code=400, detail="CO not found in this subject")
     
     # Update question
     question_data.id = question_id
     question_data.subject_id = existing_question["subject_id"]
-    question_data.updated_at = datetime.now(timezone.utc)
+    question_data.updated_at = utc_now()
     question_data.version = existing_question.get("version", 1) + 1
     
-    await db.questions.replace_one({"id": question_id}, question_data.dict())
+    await db.questions.replace_one({"id": question_id}, question_data.model_dump())
     return question_data
 
 @api_router.delete("/questions/{question_id}")
 async def delete_question(question_id: str, current_user: Dict = Depends(get_teacher_user)):
     """Delete a question (teacher/admin only)"""
-    # Verify question exists
-    existing_question = await db.questions.find_one({"id": question_id})
-    if not existing_question:
-        raise HTTPException(status_code=404, detail="Question not found")
-    
-    # Verify subject and user access
-    subject = await db.subjects.find_one({"id": existing_question["subject_id"]})
-    if not subject:
-        raise HTTPException(status_code=404, detail="Subject not found")
-    
-    if (current_user["role"] != UserRole.SUPER_ADMIN and 
-        subject["teacher_id"] != current_user["id"]):
-        raise HTTPException(status_code=403, detail="Access denied")
+    # Verify question exists and user access, with exam usage joined in
+    existing_question = await _load_question_with_access(question_id, current_user, with_usage=True)
     
     # Check if question is used in any exams
-    exam_questions_count = await db.exam_questions.count_documents({"question_id": question_id})
-    if exam_questions_count > 0:
+    if existing_question["usage"]:
         raise HTTPException(status_code=400, detail="Cannot delete question. It is being used in exams")
     
     await db.questions.delete_one({"id": question_id})
@@ -998,7 +1494,7 @@ async def delete_question(question_id: str, current_user: Dict = Depends(get_tea
 @api_router.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "timestamp": datetime.now(timezone.utc).isoformat()}
+    return {"status": "healthy", "timestamp": utc_now().isoformat()}
 
 @api_router.get("/")
 async def root():
@@ -1040,44 +1536,122 @@ app.include_router(api_router)
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+    allow_origins=CORS_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count"],
 )
 
 # Mount Socket.IO app
 app.mount("/socket.io", socket_app)
 
+# MongoDB's IndexNotFound code
+_INDEX_NOT_FOUND = 27
+
+async def _drop_index_if_present(collection: str, name: str) -> None:
+    """Drop an index, treating one already dropped (e.g. by another worker starting up) as done"""
+    try:
+        await db[collection].drop_index(name)
+    except OperationFailure as e:
+        if e.code != _INDEX_NOT_FOUND:
+            raise
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     """Initialize database indexes and setup"""
     logger.info("Starting up LMS system...")
+    logger.info(
+        "Password hashing: argon2id time_cost=%d memory_cost=%dKiB threads=%d",
+        ARGON2_TIME_COST, ARGON2_MEMORY_COST_KIB, PASSWORD_HASH_THREADS,
+    )
     
-    # Create indexes for better performance
-    await db.users.create_index("email", unique=True)
-    await db.departments.create_index("code", unique=True)
-    await db.programs.create_index("code", unique=True)
-    await db.courses.create_index([("program_id", 1), ("code", 1)], unique=True)
-    await db.subjects.create_index([("course_id", 1), ("code", 1)], unique=True)
-    await db.cos.create_index([("subject_id", 1), ("code", 1)], unique=True)
-    await db.pos.create_index([("program_id", 1), ("code", 1)], unique=True)
-    await db.co_po_mappings.create_index([("co_id", 1), ("po_id", 1)], unique=True)
-    await db.questions.create_index("subject_id")
-    await db.questions.create_index("type")
-    await db.questions.create_index("difficulty")
-    await db.questions.create_index("co_id")
-    await db.questions.create_index("tags")
+    global client, db, redis_client
+    client = AsyncMongoClient(
+        mongo_url,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        compressors=MONGO_COMPRESSORS,
+        zlibCompressionLevel=-1,
+        retryWrites=True,
+    )
+    db = client[DB_NAME]
+    app.state.mongo = client
+    # Fail fast on a bad MONGO_URL and open the first pooled connection before traffic arrives
+    await client.admin.command("ping")
+    
+    if REDIS_URL:
+        redis_client = redis_asyncio.from_url(REDIS_URL)
+    
+    # Drop question indexes superseded by the ones below first: the old non-partial tag index has
+    # the same key pattern as its replacement, and servers before 5.0 refuse to create both.
+    # Every worker runs this, so each drop tolerates the index being gone already
+    await asyncio.gather(*(
+        _drop_index_if_present("questions", name)
+        for name in (
+            "subject_id_1", "type_1", "difficulty_1", "tags_1", "subject_id_1_tags_1",
+            "subject_id_1_co_id_1_type_1_difficulty_1", "subject_id_1_tags_1_partial",
+        )
+    ))
+    
+    # Create indexes for better performance; they are independent, so issue them concurrently
+    await asyncio.gather(
+        db.users.create_index("email", unique=True),
+        db.users.create_index("id", unique=True),
+        db.users.create_index("role"),
+        db.departments.create_index("id", unique=True),
+        db.departments.create_index("code", unique=True),
+        db.programs.create_index("id", unique=True),
+        db.programs.create_index("code", unique=True),
+        db.programs.create_index("dept_id"),
+        db.courses.create_index("id", unique=True),
+        db.subjects.create_index("id", unique=True),
+        db.subjects.create_index("teacher_id"),
+        db.cos.create_index("id", unique=True),
+        db.pos.create_index("id", unique=True),
+        db.co_po_mappings.create_index("id", unique=True),
+        db.questions.create_index("id", unique=True),
+        db.courses.create_index([("program_id", 1), ("code", 1)], unique=True),
+        db.subjects.create_index([("course_id", 1), ("code", 1)], unique=True),
+        db.cos.create_index([("subject_id", 1), ("code", 1)], unique=True),
+        db.pos.create_index([("program_id", 1), ("code", 1)], unique=True),
+        db.co_po_mappings.create_index([("co_id", 1), ("po_id", 1)], unique=True),
+        db.co_po_mappings.create_index(_MAPPING_COVERING_INDEX),
+        # Question bank filters always pin subject_id, so it leads both compound indexes
+        db.questions.create_index(_QUESTION_FILTER_INDEX),
+        # Untagged questions are left out of the tag index entirely
+        db.questions.create_index(
+            [("subject_id", 1), ("tags", 1), ("id", 1)],
+            name=_QUESTION_TAGS_INDEX,
+            partialFilterExpression={"tags.0": {"$exists": True}}
+        ),
+        # CO deletion probes questions by co_id alone
+        db.questions.create_index("co_id"),
+        db.exam_questions.create_index("question_id"),
+    )
     
     logger.info("Database indexes created")
+    await _check_question_plans()
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up resources"""
-    client.close()
+    await client.close()
+    if redis_client is not None:
+        await redis_client.aclose()
+    _PW_POOL.shutdown(wait=False)
     logger.info("LMS system shutdown complete")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("server:app", host="0.0.0.0", port=8001, reload=True)
\ No newline at end of file
+    uvicorn.run(
+        "server:app",
+        host="0.0.0.0",
+        port=8001,
+        loop="uvloop",
+        http="httptools",
+        workers=WORKERS,
+    )
\ No newline at end of file
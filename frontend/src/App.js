@@ -10,6 +10,20 @@ const API = `${BACKEND_URL}/api`;
 axios.defaults.baseURL = API;
 axios.defaults.headers.common['Content-Type'] = 'application/json';
 
+// List endpoints return one page per request (at most 200 rows); follow X-Total-Count to load them all
+const PAGE_LIMIT = 200;
+const fetchAll = async (url, params = {}) => {
+  const rows = [];
+  for (;;) {
+    const response = await axios.get(url, { params: { ...params, skip: rows.length, limit: PAGE_LIMIT } });
+    rows.push(...response.data);
+    const total = Number(response.headers['x-total-count'] ?? rows.length);
+    if (response.data.length === 0 || rows.length >= total) {
+      return rows;
+    }
+  }
+};
+
 // Auth Context
 const AuthContext = createContext();
 
@@ -548,8 +562,7 @@ const DepartmentManager = () => {
   const fetchDepartments = async () => {
     setLoading(true);
     try {
-      const response = await axios.get('/departments');
-      setDepartments(response.data);
+      setDepartments(await fetchAll('/departments'));
     } catch (error) {
       setError('Failed to fetch departments');
     } finally {
@@ -692,8 +705,7 @@ const ProgramManager = () => {
   const fetchPrograms = async () => {
     setLoading(true);
     try {
-      const response = await axios.get('/programs');
-      setPrograms(response.data);
+      setPrograms(await fetchAll('/programs'));
     } catch (error) {
       setError('Failed to fetch programs');
     } finally {
@@ -703,8 +715,7 @@ const ProgramManager = () => {
 
   const fetchDepartments = async () => {
     try {
-      const response = await axios.get('/departments');
-      setDepartments(response.data);
+      setDepartments(await fetchAll('/departments'));
     } catch (error) {
       console.error('Failed to fetch departments');
     }
@@ -866,8 +877,7 @@ const CourseManager = () => {
   const fetchCourses = async () => {
     setLoading(true);
     try {
-      const response = await axios.get('/courses');
-      setCourses(response.data);
+      setCourses(await fetchAll('/courses'));
     } catch (error) {
       setError('Failed to fetch courses');
     } finally {
@@ -877,8 +887,7 @@ const CourseManager = () => {
 
   const fetchPrograms = async () => {
     try {
-      const response = await axios.get('/programs');
-      setPrograms(response.data);
+      setPrograms(await fetchAll('/programs'));
     } catch (error) {
       console.error('Failed to fetch programs');
     }
@@ -1074,8 +1083,7 @@ const UserManager = () => {
   const fetchUsers = async () => {
     setLoading(true);
     try {
-      const response = await axios.get('/users');
-      setUsers(response.data);
+      setUsers(await fetchAll('/users'));
     } catch (error) {
       setError('Failed to fetch users');
     } finally {
@@ -1254,16 +1262,19 @@ const AdminDashboard = () => {
 
   const fetchStats = async () => {
     try {
+      // List endpoints are paginated; one-item pages are enough to read X-Total-Count
+      const countParams = { params: { limit: 1 } };
       const [usersRes, deptsRes, programsRes] = await Promise.all([
-        axios.get('/users'),
-        axios.get('/departments'),
-        axios.get('/programs')
+        axios.get('/users', countParams),
+        axios.get('/departments', countParams),
+        axios.get('/programs', countParams)
       ]);
+      const totalOf = (res) => Number(res.headers['x-total-count'] ?? res.data.length);
       
       setStats({
-        users: usersRes.data.length,
-        departments: deptsRes.data.length,
-        programs: programsRes.data.length,
+        users: totalOf(usersRes),
+        departments: totalOf(deptsRes),
+        programs: totalOf(programsRes),
         courses: 0 // Will be implemented later
       });
     } catch (error) {